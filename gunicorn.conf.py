@@ -0,0 +1,22 @@
+import os
+
+# Playwright runs on a dedicated asyncio loop thread inside each worker (see
+# main._get_loop), so handler threads never touch the driver directly and
+# gthread workers are safe: concurrent requests in one worker overlap their
+# navigation/image-wait idle time on that loop instead of serializing.
+bind = f"0.0.0.0:{os.getenv('PORT', '3323')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# Preload the app so import-time work (logging, MinIO client) happens once in
+# the master; the browser itself must be launched AFTER the fork, since a
+# Chromium launched pre-fork cannot be shared across processes.
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Warm the per-worker browser so the first request doesn't pay launch cost."""
+    import main
+    main.warm_up()
@@ -1,16 +1,28 @@
+import asyncio
+import atexit
+import concurrent.futures
+import hashlib
+import io
 import os
-import tempfile
+import re
+import threading
 import logging
+from datetime import timedelta
+import cachetools
+import orjson
+import redis
 import structlog
 from flask import Flask, request, jsonify
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from flask.json.provider import JSONProvider
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 from minio import Minio
 from minio.error import S3Error
 import uuid
-from PIL import Image, ImageOps
 
 structlog.configure(
     processors=[
+        # Filter first so below-level events skip timestamping/JSON entirely.
+        structlog.stdlib.filter_by_level,
         structlog.processors.TimeStamper(fmt="ISO"),
         structlog.processors.add_log_level,
         structlog.processors.JSONRenderer()
@@ -25,216 +37,499 @@ logging.basicConfig(level=getattr(logging, log_level), format="%(message)s")
 
 logger = structlog.get_logger()
 
+class ORJSONProvider(JSONProvider):
+    """orjson-backed JSON so parsing large HTML payloads and building
+    responses doesn't go through the slower stdlib json module."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 # app.debug = True  # Disabled to prevent Playwright conflicts
 
-def render_html_to_image(html_content: str, output_path: str):
-    logger.info("Starting HTML to image rendering", output_path=output_path)
-    
-    with tempfile.NamedTemporaryFile("w+", suffix=".html", delete=False, encoding="utf-8") as tmp_html:
-        tmp_html.write(html_content)
-        tmp_html.flush()
-        html_file = tmp_html.name
+# All Playwright work runs on one dedicated asyncio loop thread per worker.
+# With the async API, concurrent requests submitted from gthread handler
+# threads overlap their navigation/image-wait idle time on that single loop
+# instead of serializing, and no handler thread ever touches Playwright
+# objects directly (the driver is not thread-safe). The loop is created
+# lazily so it starts after the Gunicorn fork, never in the preloaded master.
+_LOOP = None
+_LOOP_LOCK = threading.Lock()
 
-    try:
-        logger.info("Launching browser", html_file=html_file)
-        with sync_playwright() as p:
-            # Log available browsers for debugging
-            logger.info("Available browsers", 
-                       chromium_executable=p.chromium.executable_path if hasattr(p.chromium, 'executable_path') else "unknown")
+def _get_loop():
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_LOOP.run_forever,
+                             name="playwright-loop", daemon=True).start()
+        return _LOOP
+
+def _run_async(coro):
+    """Run a coroutine on the Playwright loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+# Long-lived Playwright + browser, started lazily on first render and reused
+# across requests so the Chromium launch cost is paid once per process instead
+# of on every call.
+_PW = None
+_BROWSER = None
+_BROWSER_LOCK = asyncio.Lock()
 
-            browser = p.chromium.launch(
+# Strip Chromium subsystems a headless screenshot workload never uses; this
+# trims per-worker RSS so more pool slots fit in RAM, and speeds cold start.
+CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-translate',
+    '--disable-features=Translate,BackForwardCache',
+    '--metrics-recording-only',
+    '--mute-audio',
+    '--no-first-run',
+    '--renderer-process-limit=1',
+    '--js-flags=--max-old-space-size=512',
+]
+
+async def _get_browser():
+    global _PW, _BROWSER
+    async with _BROWSER_LOCK:
+        if _BROWSER is None or not _BROWSER.is_connected():
+            logger.info("Starting Playwright and launching browser")
+            _PW = await async_playwright().start()
+            _BROWSER = await _PW.chromium.launch(
                 headless=True,
-                args=['--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu']
-            )
-            context = browser.new_context(
-                viewport={"width": 1080, "height": 1350},
-                device_scale_factor=2
+                args=CHROMIUM_ARGS
             )
-            page = context.new_page()
-
-            failed_requests = []
-
-            def _on_request_failed(req):
-                if req.resource_type in {"image", "media", "stylesheet"}:
-                    failed_requests.append({"url": req.url, "error": req.failure})
-            page.on("requestfailed", _on_request_failed)
-
-            page.goto(f"file://{html_file}", wait_until="domcontentloaded")
-            # Wait until all <img> and CSS background images have either loaded or errored
-            wait_for_images_script = r"""
-                () => {
-                    const urls = new Set();
-                    // collect <img> sources
-                    for (const img of Array.from(document.images)) {
-                        if (img.src) urls.add(img.src);
-                    }
-                    // collect background-image urls
-                    for (const el of Array.from(document.querySelectorAll('*'))) {
-                        const bg = getComputedStyle(el).backgroundImage;
-                        if (!bg || bg === 'none') continue;
-                        const matches = bg.match(/url\(\"?'?([^\"')]+)\"?'?\)/g) || [];
-                        for (const m of matches) {
-                            const url = m.replace(/url\(\"?'?/, '').replace(/\"?'?\)/, '');
-                            if (url) urls.add(url);
-                        }
-                    }
-                    if (urls.size === 0) return true;
-                    return Promise.all(Array.from(urls).map(u => new Promise(res => {
-                        const img = new Image();
-                        img.onload = () => res(true);
-                        img.onerror = () => res(true);
-                        img.src = u;
-                    })));
-                }
-            """
+        return _BROWSER
+
+def warm_up():
+    """Launch this process's browser ahead of the first request."""
+    _run_async(_get_browser())
+
+async def _close_browser():
+    global _PW, _BROWSER
+    async with _BROWSER_LOCK:
+        if _BROWSER is not None:
+            await _BROWSER.close()
+            _BROWSER = None
+        if _PW is not None:
+            await _PW.stop()
+            _PW = None
+
+def _shutdown_browser():
+    if _LOOP is not None and _LOOP.is_running():
+        _run_async(_close_browser())
+
+atexit.register(_shutdown_browser)
+
+VIEWPORT = {"width": 1080, "height": 1350}
+
+# Resource types and host substrings aborted before they hit the network.
+# Fonts are deliberately not blocked by default since missing webfonts change
+# the rendered pixels; add "font" to BLOCKED_RESOURCE_TYPES to trade fidelity
+# for speed.
+BLOCKED_RESOURCE_TYPES = {t.strip() for t in
+                          os.getenv("BLOCKED_RESOURCE_TYPES", "media,other").split(",")
+                          if t.strip()}
+BLOCKED_HOSTS = tuple(h.strip() for h in
+                      os.getenv("BLOCKED_HOSTS",
+                                "google-analytics.com,googletagmanager.com,doubleclick.net").split(",")
+                      if h.strip())
+
+async def _filter_request(route, req):
+    if req.resource_type in BLOCKED_RESOURCE_TYPES or any(h in req.url for h in BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def _install_request_filter(page):
+    # Interception itself has per-request overhead, so only hook when there
+    # is actually something to block.
+    if BLOCKED_RESOURCE_TYPES or BLOCKED_HOSTS:
+        await page.route("**/*", _filter_request)
+
+# Render at the final resolution. 2x rendering quadruples Chromium's
+# pixel-shading work and screenshot size only to be downscaled again by
+# consumers; callers that need high-DPI output pass "scale" per request.
+DEVICE_SCALE_FACTOR = float(os.getenv("DEVICE_SCALE_FACTOR", "1"))
+
+class PagePool:
+    """Bounded pool of ready (BrowserContext, Page) pairs.
+
+    Creating and tearing down a context + page costs tens of ms per request,
+    so pages are created lazily up to `size`, reset to about:blank between
+    uses, and reused. Keeping the pool small also avoids contention on
+    Chromium's internal screenshot queue when many pages share one browser.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._queue = asyncio.Queue(maxsize=size)
+        self._lock = asyncio.Lock()
+        self._created = 0
+
+    async def _new_page(self):
+        browser = await _get_browser()
+        context = await browser.new_context(
+            viewport=VIEWPORT,
+            device_scale_factor=DEVICE_SCALE_FACTOR
+        )
+        try:
+            page = await context.new_page()
+            await _install_request_filter(page)
+        except Exception:
             try:
-                page.wait_for_function(wait_for_images_script, timeout=10000)
-            except PlaywrightTimeoutError:
-                logger.warning("Timed out waiting for images to load completely", html_file=html_file)
+                await context.close()
+            except Exception:
+                pass
+            raise
+        return context, page
+
+    async def acquire(self, timeout: float = 30):
+        try:
+            return self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            # Reserve a slot under the lock, but build the page outside it so
+            # a hung browser launch can't block every other acquirer.
+            async with self._lock:
+                reserved = self._created < self._size
+                if reserved:
+                    self._created += 1
+            if reserved:
+                try:
+                    return await self._new_page()
+                except Exception:
+                    # Give the slot back, or failures would permanently
+                    # shrink the pool until no page can ever be created.
+                    async with self._lock:
+                        self._created -= 1
+                    raise
+            return await asyncio.wait_for(self._queue.get(), timeout)
+
+    async def release(self, context, page):
+        """Reset the page and return it to the pool; discard it if reset fails."""
+        try:
+            await page.goto("about:blank")
+            self._queue.put_nowait((context, page))
+        except Exception as e:
+            logger.warning("Discarding page from pool", error=str(e))
+            await self.discard(context, page)
 
-            # Small extra buffer for big assets
-            page.wait_for_timeout(1000)
+    async def discard(self, context, page):
+        async with self._lock:
+            self._created -= 1
+        try:
+            await context.close()
+        except Exception:
+            pass
 
-            page.screenshot(path=output_path, full_page=False)
-            browser.close()
+PAGE_POOL = PagePool(size=int(os.getenv("PAGE_POOL_SIZE", "2")))
 
-            if failed_requests:
-                logger.warning("Some resources failed to load", failed_requests=failed_requests[:5])
+def render_html_to_image(html_content: str, scale: float = None) -> bytes:
+    """Render the HTML and return the screenshot as JPEG bytes."""
+    return _run_async(_render_html_to_image(html_content, scale))
 
-            logger.info("Screenshot completed successfully", output_path=output_path)
+async def _render_html_to_image(html_content: str, scale: float = None) -> bytes:
+    logger.debug("Starting HTML to image rendering", html_length=len(html_content))
+
+    try:
+        if scale is not None and scale != DEVICE_SCALE_FACTOR:
+            # Pooled contexts are built at DEVICE_SCALE_FACTOR; a caller asking
+            # for a different scale gets a one-off context instead.
+            browser = await _get_browser()
+            context = await browser.new_context(
+                viewport=VIEWPORT,
+                device_scale_factor=scale
+            )
+            try:
+                page = await context.new_page()
+                await _install_request_filter(page)
+                return await _capture_page(page, html_content)
+            finally:
+                await context.close()
+
+        context, page = await PAGE_POOL.acquire()
+        try:
+            image_bytes = await _capture_page(page, html_content)
+            await PAGE_POOL.release(context, page)
+            return image_bytes
+        except Exception:
+            # The page may be in an unknown state; don't return it to the pool.
+            await PAGE_POOL.discard(context, page)
+            raise
     except Exception as e:
-        logger.error("Failed to render HTML to image", error=str(e), html_file=html_file, 
+        logger.error("Failed to render HTML to image", error=str(e),
                     error_type=type(e).__name__)
         raise
+
+# Image/background URLs referenced by the payload, extracted server-side with
+# one linear scan of the HTML instead of a getComputedStyle walk over every
+# DOM element inside the page.
+_ASSET_URL_RE = re.compile(r'(?:src\s*=\s*["\']([^"\']+)|url\(\s*["\']?([^"\')]+))', re.I)
+
+# Resolves once every given URL has either loaded or errored.
+_WAIT_FOR_URLS_SCRIPT = """
+    (urls) => Promise.all(urls.map(u => new Promise(res => {
+        const img = new Image();
+        img.onload = () => res(true);
+        img.onerror = () => res(true);
+        img.src = u;
+    })))
+"""
+
+def _extract_asset_urls(html_content):
+    urls = {m.group(1) or m.group(2) for m in _ASSET_URL_RE.finditer(html_content)}
+    return [u for u in urls if u and not u.startswith("data:")]
+
+async def _capture_page(page, html_content: str) -> bytes:
+    failed_requests = []
+
+    def _on_request_failed(req):
+        if req.resource_type in {"image", "media", "stylesheet"}:
+            failed_requests.append({"url": req.url, "error": req.failure})
+    page.on("requestfailed", _on_request_failed)
+
+    try:
+        asset_urls = _extract_asset_urls(html_content)
+
+        # Feed the HTML straight from memory; no temp file / file:// round-trip.
+        await page.set_content(html_content, wait_until="domcontentloaded")
+
+        if asset_urls:
+            try:
+                await page.wait_for_function(_WAIT_FOR_URLS_SCRIPT,
+                                             arg=asset_urls, timeout=10000)
+            except PlaywrightTimeoutError:
+                logger.warning("Timed out waiting for images to load completely")
+
+            # The wait above already resolves on img.onload, so only a short
+            # settling buffer is needed for paint/decoding.
+            await page.wait_for_timeout(200)
+
+        # Let Chromium's native encoder emit JPEG directly; no PNG-on-disk
+        # plus Pillow re-encode round-trip.
+        image_bytes = await page.screenshot(type="jpeg", quality=85, full_page=False)
+
+        if failed_requests:
+            logger.warning("Some resources failed to load", failed_requests=failed_requests[:5])
+
+        logger.debug("Screenshot completed successfully", image_size=len(image_bytes))
+        return image_bytes
     finally:
-        if os.path.exists(html_file):
-            os.remove(html_file)
-            logger.debug("Cleaned up temporary HTML file", html_file=html_file)
-        
-# Configuración de MinIO
+        page.remove_listener("requestfailed", _on_request_failed)
+
+
+# Configuración de MinIO — everything comes from the environment (see
+# .env.example); credentials are never committed. The localhost defaults are
+# for development only, and production (APP_ENV=production) refuses to start
+# without real values.
+APP_ENV = os.getenv("APP_ENV", "development")
+MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "localhost:9000")
+MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "")
+MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "")
+MINIO_REGION = os.getenv("MINIO_REGION", "us-east-1")
+MINIO_SECURE = os.getenv("MINIO_SECURE", "true").lower() in ("1", "true", "yes")
+BUCKET_NAME = os.getenv("MINIO_BUCKET", "htmltoimg")
+
+if APP_ENV == "production" and not (os.getenv("MINIO_ENDPOINT")
+                                    and MINIO_ACCESS_KEY and MINIO_SECRET_KEY
+                                    and os.getenv("MINIO_BUCKET")):
+    raise RuntimeError(
+        "MINIO_ENDPOINT, MINIO_ACCESS_KEY, MINIO_SECRET_KEY and MINIO_BUCKET "
+        "must be set when APP_ENV=production"
+    )
+
 MINIO_CLIENT = Minio(
-    "minio-nwo004cws40gwwkcs8008oog.automatadr.com",
-    access_key="I9BKXRAMi9Pui8XmEyhm",
-    secret_key="7ATtXmegPRlQjyFMnK49b0My65jWzbJNxSuGnoR2",
-    region="us-east-1",
-    secure=True
+    MINIO_ENDPOINT,
+    access_key=MINIO_ACCESS_KEY,
+    secret_key=MINIO_SECRET_KEY,
+    region=MINIO_REGION,
+    secure=MINIO_SECURE
 )
-BUCKET_NAME = "recorddo"
 
-def compress_image(image_path, quality=85, max_width=1920):
-    """Compress image to reduce file size while maintaining quality"""
-    logger.info("Starting image compression", image_path=image_path, quality=quality, max_width=max_width)
-    
+# Renders keyed by sha256(html): identical payloads resolve to the same
+# object name, so repeat requests are answered from this LRU (or a cheap
+# stat_object on cold workers) without touching the browser.
+_RENDER_CACHE = cachetools.LRUCache(maxsize=int(os.getenv("RENDER_CACHE_SIZE", "1024")))
+_RENDER_CACHE_LOCK = threading.Lock()
+
+# Optional persistent cache layer (set REDIS_URL to enable) so hits survive
+# worker restarts and deploys; checked between the in-process LRU and the
+# stat_object fallback. Entries expire after RENDER_CACHE_TTL seconds;
+# expiring the MinIO objects themselves is left to a bucket lifecycle rule.
+REDIS_URL = os.getenv("REDIS_URL", "")
+RENDER_CACHE_TTL = int(os.getenv("RENDER_CACHE_TTL", str(30 * 86400)))
+_REDIS = redis.Redis.from_url(REDIS_URL, decode_responses=True) if REDIS_URL else None
+
+# Public URL prefix, built once at startup instead of re-deriving the scheme
+# and joining strings on every request.
+_BASE_URL = f"{'https' if MINIO_SECURE else 'http'}://{MINIO_ENDPOINT}/{BUCKET_NAME}"
+
+def _object_url(filename):
+    return f"{_BASE_URL}/{filename}"
+
+def _cached_render_url(key):
+    """Return the URL for an already-rendered HTML hash, or None."""
+    filename = f"{key}.jpg"
+    with _RENDER_CACHE_LOCK:
+        url = _RENDER_CACHE.get(key)
+    if url is not None:
+        return url
+    if _REDIS is not None:
+        try:
+            url = _REDIS.get(f"render:{key}")
+        except redis.RedisError as e:
+            logger.warning("Redis lookup failed", error=str(e))
+            url = None
+        if url:
+            with _RENDER_CACHE_LOCK:
+                _RENDER_CACHE[key] = url
+            return url
     try:
-        with Image.open(image_path) as img:
-            # Convert to RGB if necessary (for PNG with transparency)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                if img.mode in ('RGBA', 'LA'):
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            
-            # Resize if image is too wide
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_height = int(img.height * ratio)
-                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-                logger.info("Image resized", original_width=img.width, new_width=max_width, new_height=new_height)
-            
-            # Create compressed output path
-            compressed_path = image_path.replace('.png', '_compressed.jpg')
-            
-            # Save with compression
-            img.save(compressed_path, 'JPEG', quality=quality, optimize=True)
-            
-            # Get file sizes for logging
-            original_size = os.path.getsize(image_path)
-            compressed_size = os.path.getsize(compressed_path)
-            compression_ratio = (1 - compressed_size/original_size) * 100
-            
-            logger.info("Image compression completed", 
-                       original_size=original_size, 
-                       compressed_size=compressed_size,
-                       compression_ratio=f"{compression_ratio:.1f}%",
-                       compressed_path=compressed_path)
-            
-            return compressed_path
-            
-    except Exception as e:
-        logger.error("Image compression failed", error=str(e), image_path=image_path)
-        return image_path  # Return original path if compression fails
+        MINIO_CLIENT.stat_object(BUCKET_NAME, filename)
+    except S3Error:
+        return None
+    url = _object_url(filename)
+    _remember_render(key, url)
+    return url
+
+def _remember_render(key, url):
+    with _RENDER_CACHE_LOCK:
+        _RENDER_CACHE[key] = url
+    if _REDIS is not None:
+        try:
+            _REDIS.setex(f"render:{key}", RENDER_CACHE_TTL, url)
+        except redis.RedisError as e:
+            logger.warning("Redis store failed", error=str(e))
+
+def _forget_render(key):
+    with _RENDER_CACHE_LOCK:
+        _RENDER_CACHE.pop(key, None)
+    if _REDIS is not None:
+        try:
+            _REDIS.delete(f"render:{key}")
+        except redis.RedisError as e:
+            logger.warning("Redis delete failed", error=str(e))
+
+# Uploads for the synchronous endpoint run here so /render can answer as soon
+# as the screenshot exists; the object name is deterministic, so the URL is
+# known before the PUT finishes.
+_UPLOADER = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv("UPLOAD_WORKERS", "8")),
+    thread_name_prefix="minio-upload"
+)
+
+def _schedule_upload(image_bytes, filename, key):
+    """Kick off the MinIO upload in the background.
+
+    On failure the cache entry for `key` is dropped so a retry re-renders
+    instead of serving a URL that will never resolve; callers must therefore
+    populate the cache *before* submitting. Clients that must confirm
+    availability can poll /status/<filename>.
+    """
+    def _done(fut):
+        exc = fut.exception()
+        if exc is not None:
+            logger.error("Background upload failed", filename=filename, error=str(exc))
+            _forget_render(key)
+
+    _UPLOADER.submit(upload_to_minio, image_bytes, filename).add_done_callback(_done)
+
+def upload_to_minio(image_bytes, filename):
+    """Upload JPEG bytes to MinIO and return the URL"""
+    logger.debug("Starting MinIO upload", filename=filename, size=len(image_bytes))
 
-def upload_to_minio(image_path):
-    """Upload image to MinIO and return the URL"""
-    # Compress image before upload
-    compressed_path = compress_image(image_path)
-    
-    # Determine file extension and content type based on compressed image
-    if compressed_path.endswith('.jpg'):
-        filename = f"image_{uuid.uuid4()}.jpg"
-        content_type = "image/jpeg"
-    else:
-        filename = f"image_{uuid.uuid4()}.png"
-        content_type = "image/png"
-    
-    logger.info("Starting MinIO upload", filename=filename, image_path=compressed_path)
-    
     try:
-        # Upload compressed file
-        MINIO_CLIENT.fput_object(
+        # Explicit 5 MiB parts with parallel part uploads: screenshots below
+        # part_size still go up as a single PUT, larger ones ship over several
+        # TCP connections instead of one.
+        MINIO_CLIENT.put_object(
             BUCKET_NAME,
             filename,
-            compressed_path,
-            content_type=content_type
+            io.BytesIO(image_bytes),
+            length=len(image_bytes),
+            part_size=5 * 1024 * 1024,
+            num_parallel_uploads=4,
+            content_type="image/jpeg"
         )
-        
-        # Return the public URL
-        url = f"https://minio-nwo004cws40gwwkcs8008oog.automatadr.com/{BUCKET_NAME}/{filename}"
-        logger.info("MinIO upload successful", filename=filename, url=url)
-        
-        # Clean up compressed file if it's different from original
-        if compressed_path != image_path and os.path.exists(compressed_path):
-            os.remove(compressed_path)
-            logger.debug("Cleaned up compressed file", compressed_path=compressed_path)
-            
+
+        url = _object_url(filename)
+        logger.debug("MinIO upload successful", filename=filename, url=url)
         return url
-    
+
     except S3Error as e:
         logger.error("MinIO upload failed", filename=filename, error=str(e))
-        # Clean up compressed file on error
-        if compressed_path != image_path and os.path.exists(compressed_path):
-            os.remove(compressed_path)
         raise Exception(f"MinIO upload failed: {e}")
 
-@app.route("/render", methods=["POST"])
-def render():
-    request_id = str(uuid.uuid4())[:8]
-    logger.info("Received render request", request_id=request_id, 
-                content_type=request.content_type)
-    
-    if not request.is_json:
+def _parse_render_payload(request_id):
+    """Validate the request JSON and return (html_content, scale, error_response)."""
+    if request.mimetype != "application/json":
         logger.warning("Invalid request - not JSON", request_id=request_id)
-        return jsonify({"error": "Se requiere JSON con clave 'html'"}), 400
-    
+        return None, None, (jsonify({"error": "Se requiere JSON con clave 'html'"}), 400)
+
     data = request.get_json()
     if "html" not in data:
         logger.warning("Invalid request - missing html key", request_id=request_id)
-        return jsonify({"error": "Falta la clave 'html' en el JSON"}), 400
+        return None, None, (jsonify({"error": "Falta la clave 'html' en el JSON"}), 400)
 
-    html_content = data["html"]
-    html_length = len(html_content)
-    output_path = tempfile.NamedTemporaryFile(suffix=".png", delete=False).name
+    # Optional high-DPI override; renders at DEVICE_SCALE_FACTOR when absent.
+    scale = data.get("scale")
+    if scale is not None:
+        try:
+            scale = float(scale)
+        except (TypeError, ValueError):
+            logger.warning("Invalid request - bad scale value", request_id=request_id)
+            return None, None, (jsonify({"error": "La clave 'scale' debe ser un número"}), 400)
+
+    return data["html"], scale, None
+
+def _render_key(html_content, scale):
+    key_material = html_content if scale is None else f"{scale}:{html_content}"
+    return hashlib.sha256(key_material.encode()).hexdigest()
+
+@app.route("/render", methods=["POST"])
+def render():
+    request_id = uuid.uuid4().hex[:8]
+    logger.info("Received render request", request_id=request_id, 
+                content_type=request.content_type)
     
-    logger.info("Processing render request", request_id=request_id, 
-                html_length=html_length, output_path=output_path)
+    html_content, scale, error = _parse_render_payload(request_id)
+    if error is not None:
+        return error
+    html_length = len(html_content)
+    key = _render_key(html_content, scale)
+
+    cached_url = _cached_render_url(key)
+    if cached_url is not None:
+        logger.info("Render request served from cache", request_id=request_id,
+                    image_url=cached_url)
+        return jsonify({
+            "success": True,
+            "url": cached_url
+        })
+
+    logger.debug("Processing render request", request_id=request_id,
+                html_length=html_length)
 
     try:
-        render_html_to_image(html_content, output_path)
-        image_url = upload_to_minio(output_path)
-        logger.info("Render request completed successfully", request_id=request_id, 
+        image_bytes = render_html_to_image(html_content, scale)
+        filename = f"{key}.jpg"
+        image_url = _object_url(filename)
+        # Cache before submitting the upload so the failure callback's
+        # eviction can't run ahead of the insertion and leave a dead URL
+        # cached for the full TTL.
+        _remember_render(key, image_url)
+        _schedule_upload(image_bytes, filename, key)
+        logger.info("Render request completed successfully", request_id=request_id,
                     image_url=image_url)
         return jsonify({
             "success": True,
@@ -243,18 +538,69 @@ def render():
     except Exception as e:
         logger.error("Render request failed", request_id=request_id, error=str(e))
         return jsonify({"error": str(e)}), 500
-    finally:
-        if os.path.exists(output_path):
-            os.remove(output_path)
-            logger.debug("Cleaned up output file", request_id=request_id, 
-                        output_path=output_path)
+
+# Background render+upload jobs for /render-async. The object name is known
+# up front (content hash), so the response doesn't need to wait for the work.
+_BACKGROUND = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv("BACKGROUND_RENDER_WORKERS", "4")),
+    thread_name_prefix="render-async"
+)
+
+def _background_render(key, html_content, scale):
+    try:
+        image_bytes = render_html_to_image(html_content, scale)
+        url = upload_to_minio(image_bytes, f"{key}.jpg")
+        _remember_render(key, url)
+    except Exception as e:
+        logger.error("Background render failed", key=key, error=str(e))
+
+@app.route("/render-async", methods=["POST"])
+def render_async():
+    """Queue the render and return immediately with a presigned GET URL.
+
+    The URL resolves once the object exists; clients poll it (or HEAD it)
+    instead of holding a worker for the whole render + upload.
+    """
+    request_id = uuid.uuid4().hex[:8]
+    html_content, scale, error = _parse_render_payload(request_id)
+    if error is not None:
+        return error
+    key = _render_key(html_content, scale)
+    filename = f"{key}.jpg"
+
+    cached = _cached_render_url(key) is not None
+    if not cached:
+        _BACKGROUND.submit(_background_render, key, html_content, scale)
+
+    presigned_url = MINIO_CLIENT.presigned_get_object(
+        BUCKET_NAME, filename, expires=timedelta(hours=1)
+    )
+    logger.info("Render job queued", request_id=request_id, job_id=key, cached=cached)
+    return jsonify({
+        "success": True,
+        "job_id": key,
+        "url": presigned_url,
+        "ready": cached
+    }), 202
+
+@app.route("/status/<filename>", methods=["GET"])
+def status(filename):
+    """Confirm whether an uploaded object is available yet."""
+    try:
+        MINIO_CLIENT.stat_object(BUCKET_NAME, filename)
+        return jsonify({"ready": True})
+    except S3Error:
+        return jsonify({"ready": False}), 404
 
 @app.route("/health", methods=["GET"])
 def health():
     return jsonify({"status": "healthy", "service": "htmltoimg"})
 
+# Development entrypoint only. In production run under Gunicorn
+# (`gunicorn -c gunicorn.conf.py main:app`) so each pre-forked worker owns its
+# own warmed browser; see gunicorn.conf.py.
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 3323))
-    logger.info("Starting HTML to Image service", 
+    logger.info("Starting HTML to Image service (dev server)",
                 host="0.0.0.0", port=port, bucket=BUCKET_NAME)
     app.run(host="0.0.0.0", port=port, debug=False)